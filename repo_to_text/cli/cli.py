@@ -12,9 +12,13 @@ from typing import NoReturn
 from ..utils.utils import setup_logging
 from ..core.core import save_repo_to_text
 
-def create_default_settings_file() -> None:
-    """Create a default .repo-to-text-settings.yaml file."""
-    settings_file = '.repo-to-text-settings.yaml'
+def create_default_settings_file(target_dir: str = '.') -> None:
+    """Create a default .repo-to-text-settings.yaml file.
+
+    Args:
+        target_dir: Directory to create the settings file in
+    """
+    settings_file = os.path.join(target_dir, '.repo-to-text-settings.yaml')
     if os.path.exists(settings_file):
         raise FileExistsError(
             f"The settings file '{settings_file}' already exists. "
@@ -39,7 +43,7 @@ def create_default_settings_file() -> None:
           - "README.md"
           - "LICENSE"
     """)
-    with open('.repo-to-text-settings.yaml', 'w', encoding='utf-8') as f:
+    with open(settings_file, 'w', encoding='utf-8') as f:
         f.write(default_settings)
     print("Default .repo-to-text-settings.yaml created.")
 
@@ -82,7 +86,7 @@ def main() -> NoReturn:
 
     try:
         if args.create_settings:
-            create_default_settings_file()
+            create_default_settings_file(args.input_dir)
             logging.debug('.repo-to-text-settings.yaml file created')
         else:
             save_repo_to_text(
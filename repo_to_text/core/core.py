@@ -3,109 +3,163 @@ Core functionality for repo-to-text
 """
 
 import os
-import subprocess
-from typing import Tuple, Optional, List, Dict, Any, Set
+from typing import Tuple, Optional, List, Dict, Any, Iterator, Union, Callable
 from datetime import datetime, timezone
 from importlib.machinery import ModuleSpec
 import logging
+import re
 import yaml
-import pathspec
 from pathspec import PathSpec
+from pathspec.util import normalize_file
 
-from ..utils.utils import check_tree_command, is_ignored_path
+from ..utils.utils import is_ignored_path
+
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:  # PyYAML built without LibYAML
+    from yaml import SafeLoader as _YamlLoader  # type: ignore
+
+_GITIGNORE = '.gitignore'
+_SETTINGS = '.repo-to-text-settings.yaml'
+
+# Line prefixes, matching the output of `tree` with UTF-8 line drawing
+_TREE_BRANCH = '├── '
+_TREE_LAST_BRANCH = '└── '
+_TREE_INDENT = '│\u00a0\u00a0 '
+_TREE_LAST_INDENT = '    '
 
 def get_tree_structure(
         path: str = '.',
         gitignore_spec: Optional[PathSpec] = None,
         tree_and_content_ignore_spec: Optional[PathSpec] = None
     ) -> str:
-    """Generate tree structure of the directory."""
-    if not check_tree_command():
-        return ""
+    """Generate tree structure of the directory.
 
+    Entries are listed like ``tree -a -f`` would list them, without the root
+    line. Ignored entries and directories without any remaining files are left
+    out, and ignored directories are not descended into at all.
+    """
     logging.debug('Generating tree structure for path: %s', path)
-    tree_output = run_tree_command(path)
-    logging.debug('Tree output generated:\n%s', tree_output)
-
-    if not gitignore_spec and not tree_and_content_ignore_spec:
-        logging.debug('No .gitignore or ignore-tree-and-content specification found')
-        return tree_output
-
-    logging.debug('Filtering tree output based on ignore specifications')
-    return filter_tree_output(tree_output, path, gitignore_spec, tree_and_content_ignore_spec)
-
-def run_tree_command(path: str) -> str:
-    """Run the tree command and return its output."""
-    result = subprocess.run(
-        ['tree', '-a', '-f', '--noreport', path],
-        stdout=subprocess.PIPE,
-        check=True
-    )
-    return result.stdout.decode('utf-8')
-
-def filter_tree_output(
-        tree_output: str,
-        path: str,
-        gitignore_spec: Optional[PathSpec],
-        tree_and_content_ignore_spec: Optional[PathSpec]
-    ) -> str:
-    """Filter the tree output based on ignore specifications."""
-    lines: List[str] = tree_output.splitlines()
-    non_empty_dirs: Set[str] = set()
-
-    filtered_lines = [
-        process_line(line, path, gitignore_spec, tree_and_content_ignore_spec, non_empty_dirs)
-        for line in lines
-    ]
+    display_root = '' if os.path.normpath(path) == '.' else path.rstrip('/\\') + '/'
+    prune_specs = prunable_specs(gitignore_spec, tree_and_content_ignore_spec)
+
+    def build_tree_lines(dir_path: str, relative_dir: str) -> List[str]:
+        """Build the tree lines for the contents of a single directory.
+
+        Works post-order: a subdirectory is only listed once its own lines are
+        known to be non-empty, so empty directories are dropped in the same pass
+        and the last visible entry always gets the closing branch.
+        """
+        prefix = relative_dir + '/' if relative_dir else ''
+        # Each visible entry's label with the lines of its own children
+        visible: List[Tuple[str, List[str]]] = []
+        for entry in sorted_dir_entries(dir_path):
+            relative_path = prefix + entry.name
+            try:
+                is_dir = entry.is_dir(follow_symlinks=False)
+            except OSError:
+                is_dir = False
 
-    filtered_tree_output = '\n'.join(filter(None, filtered_lines))
-    logging.debug('Filtered tree structure:\n%s', filtered_tree_output)
-    return filtered_tree_output
+            ignored = should_ignore_file(
+                entry.path,
+                relative_path,
+                gitignore_spec,
+                None,
+                tree_and_content_ignore_spec
+            )
+            if not is_dir:
+                if ignored:
+                    logging.debug('Ignored: %s', relative_path)
+                elif entry.is_symlink():
+                    visible.append((
+                        f'{display_root}{relative_path} -> {os.readlink(entry.path)}', []
+                    ))
+                else:
+                    visible.append((display_root + relative_path, []))
+                continue
 
-def process_line(
-        line: str,
-        path: str,
-        gitignore_spec: Optional[PathSpec],
-        tree_and_content_ignore_spec: Optional[PathSpec],
-        non_empty_dirs: Set[str]
-    ) -> Optional[str]:
-    """Process a single line of the tree output."""
-    full_path = extract_full_path(line, path)
-    if not full_path or full_path == '.':
-        return None
+            if ignored and should_prune_dir(entry.path, relative_path, prune_specs):
+                logging.debug('Ignored: %s', relative_path)
+                continue
+            try:
+                child_lines = build_tree_lines(entry.path, relative_path)
+            except OSError as e:
+                logging.debug('Could not scan directory %s: %s', entry.path, e)
+                continue
+            if child_lines:
+                visible.append((display_root + relative_path, child_lines))
 
-    relative_path = os.path.relpath(full_path, path).replace(os.sep, '/')
+        return join_tree_branches(visible)
 
-    if should_ignore_file(
-        full_path,
-        relative_path,
-        gitignore_spec,
-        None,
-        tree_and_content_ignore_spec
-    ):
-        logging.debug('Ignored: %s', relative_path)
-        return None
+    tree_output = '\n'.join(build_tree_lines(path, ''))
+    logging.debug('Tree structure:\n%s', tree_output)
+    return tree_output
 
-    if not os.path.isdir(full_path):
-        mark_non_empty_dirs(relative_path, non_empty_dirs)
+def sorted_dir_entries(path: str) -> List[os.DirEntry]:
+    """List a directory's entries sorted by name, ignoring case.
 
-    if not os.path.isdir(full_path) or os.path.dirname(relative_path) in non_empty_dirs:
-        return line.replace('./', '', 1)
-    return None
+    ``tree`` sorts with the locale's collation, which under the usual UTF-8
+    locales does not put uppercase names first. Ties are broken by the exact
+    name so the order stays stable.
+    """
+    with os.scandir(path) as it:
+        return sorted(it, key=lambda entry: (entry.name.lower(), entry.name))
+
+def join_tree_branches(visible: List[Tuple[str, List[str]]]) -> List[str]:
+    """Prefix sibling entries and their children with tree branch characters."""
+    lines: List[str] = []
+    for index, (label, child_lines) in enumerate(visible):
+        is_last = index == len(visible) - 1
+        lines.append((_TREE_LAST_BRANCH if is_last else _TREE_BRANCH) + label)
+        indent = _TREE_LAST_INDENT if is_last else _TREE_INDENT
+        lines.extend(indent + line for line in child_lines)
+    return lines
+
+_NAMED_GROUP_RE = re.compile(r'(?<!\\)\(\?P<\w+>')
+
+class CombinedPathSpec(PathSpec):
+    """PathSpec that matches runs of patterns with a single regex each.
+
+    ``PathSpec.match_file`` tries each compiled pattern in turn, and the last
+    pattern that matches decides. Consecutive patterns of the same kind
+    (ignore or ``!`` re-include) are folded into one alternation, and the runs
+    are checked from last to first, so the first run that matches decides.
+    A spec without negations is a single regex; each ``!pattern`` only splits
+    off another run instead of turning the combining off.
+    """
 
-def extract_full_path(line: str, path: str) -> Optional[str]:
-    """Extract the full path from a line of tree output."""
-    idx = line.find('./')
-    if idx == -1:
-        idx = line.find(path)
-    return line[idx:].strip() if idx != -1 else None
+    def __init__(self, patterns: Any, **kwargs: Any) -> None:
+        super().__init__(patterns, **kwargs)
+        # (include, regex) for each run of same-kind patterns, last run first;
+        # None falls back to the regular per-pattern matching
+        self._pattern_runs: Optional[List[Tuple[bool, 're.Pattern[str]']]] = None
 
-def mark_non_empty_dirs(relative_path: str, non_empty_dirs: Set[str]) -> None:
-    """Mark all parent directories of a file as non-empty."""
-    dir_path = os.path.dirname(relative_path)
-    while dir_path:
-        non_empty_dirs.add(dir_path)
-        dir_path = os.path.dirname(dir_path)
+        runs: List[Tuple[bool, List[str]]] = []
+        for pattern in self.patterns:
+            if pattern.include is None:
+                continue
+            regex = getattr(pattern, 'regex', None)
+            if regex is None or not isinstance(regex.pattern, str):
+                return
+            if not runs or runs[-1][0] != pattern.include:
+                runs.append((pattern.include, []))
+            # Named groups may repeat across patterns, which one regex cannot hold
+            runs[-1][1].append(_NAMED_GROUP_RE.sub('(?:', regex.pattern))
+
+        self._pattern_runs = [
+            (include, re.compile('|'.join(f'(?:{src})' for src in sources)))
+            for include, sources in reversed(runs)
+        ]
+
+    def match_file(self, file: Any, separators: Any = None) -> bool:
+        """Check if the file matches this spec."""
+        if self._pattern_runs is None:
+            return super().match_file(file, separators)
+        normalized = normalize_file(file, separators)
+        for include, regex in self._pattern_runs:
+            if regex.search(normalized) is not None:
+                return include
+        return False
 
 def load_ignore_specs(
         path: str = '.',
@@ -126,14 +180,14 @@ def load_ignore_specs(
     tree_and_content_ignore_list: List[str] = []
     use_gitignore = True
 
-    repo_settings_path = os.path.join(path, '.repo-to-text-settings.yaml')
+    repo_settings_path = os.path.join(path, _SETTINGS)
     if os.path.exists(repo_settings_path):
-        logging.debug('Loading .repo-to-text-settings.yaml from path: %s', repo_settings_path)
+        logging.debug('Loading %s from path: %s', _SETTINGS, repo_settings_path)
         with open(repo_settings_path, 'r', encoding='utf-8') as f:
-            settings: Dict[str, Any] = yaml.safe_load(f)
+            settings: Dict[str, Any] = yaml.load(f, Loader=_YamlLoader)
             use_gitignore = settings.get('gitignore-import-and-ignore', True)
             if 'ignore-content' in settings:
-                content_ignore_spec: Optional[PathSpec] = pathspec.PathSpec.from_lines(
+                content_ignore_spec: Optional[PathSpec] = CombinedPathSpec.from_lines(
                     'gitwildmatch', settings['ignore-content']
                 )
             if 'ignore-tree-and-content' in settings:
@@ -143,13 +197,13 @@ def load_ignore_specs(
         tree_and_content_ignore_list.extend(cli_ignore_patterns)
 
     if use_gitignore:
-        gitignore_path = os.path.join(path, '.gitignore')
+        gitignore_path = os.path.join(path, _GITIGNORE)
         if os.path.exists(gitignore_path):
             logging.debug('Loading .gitignore from path: %s', gitignore_path)
             with open(gitignore_path, 'r', encoding='utf-8') as f:
-                gitignore_spec = pathspec.PathSpec.from_lines('gitwildmatch', f)
+                gitignore_spec = CombinedPathSpec.from_lines('gitwildmatch', f)
 
-    tree_and_content_ignore_spec = pathspec.PathSpec.from_lines(
+    tree_and_content_ignore_spec = CombinedPathSpec.from_lines(
         'gitwildmatch', tree_and_content_ignore_list
     )
     return gitignore_spec, content_ignore_spec, tree_and_content_ignore_spec
@@ -205,12 +259,15 @@ def should_ignore_file(
     return result
 
 def save_repo_to_text(
-        path: str = '.',
-        output_dir: Optional[str] = None,
+        path: Union[str, os.PathLike] = '.',
+        output_dir: Optional[Union[str, os.PathLike]] = None,
         to_stdout: bool = False,
         cli_ignore_patterns: Optional[List[str]] = None
     ) -> str:
     """Save repository structure and contents to a text file."""
+    path = os.fspath(path)
+    if output_dir is not None:
+        output_dir = os.fspath(output_dir)
     logging.debug('Starting to save repo structure to text for path: %s', path)
     gitignore_spec, content_ignore_spec, tree_and_content_ignore_spec = load_ignore_specs(
         path, cli_ignore_patterns
@@ -242,6 +299,130 @@ def save_repo_to_text(
 
     return output_file
 
+# One literal character of a regex: an escaped symbol or a non-special character
+_REGEX_LITERAL_RE = re.compile(r'\\([^0-9A-Za-z])|([^\\.^$*+?{}\[\]|()])')
+
+def negation_prefix(pattern: Any) -> Optional[str]:
+    """Get the literal text every path matched by a pattern starts with.
+
+    Args:
+        pattern: Compiled pattern of a PathSpec
+
+    Returns:
+        Optional[str]: The prefix, or None if the pattern is not anchored to
+        the root and can match at any depth
+    """
+    regex = getattr(pattern, 'regex', None)
+    if regex is None or not isinstance(regex.pattern, str) or not regex.pattern.startswith('^'):
+        return None
+    source = regex.pattern
+    literal: List[str] = []
+    position = 1
+    match = _REGEX_LITERAL_RE.match(source, position)
+    while match:
+        literal.append(match.group(1) or match.group(2))
+        position = match.end()
+        match = _REGEX_LITERAL_RE.match(source, position)
+    # A quantifier makes the character before it optional
+    if literal and source[position:position + 1] in ('*', '+', '?', '{'):
+        literal.pop()
+    return ''.join(literal) or None
+
+def prunable_specs(*specs: Optional[PathSpec]) -> List[Tuple[PathSpec, List[str]]]:
+    """Select the specs that can skip matched directories as a whole.
+
+    A directory matched by a spec can be skipped when no ``!pattern`` of that
+    spec can match anything below it, since every path under it matches too.
+    Each negation is reduced to the prefix its matches start with, and
+    ``should_prune_dir`` checks it against the directory. A negation that can
+    match at any depth (``!.env.example``) may re-include a file under any
+    ignored directory, so its spec is left out.
+
+    Returns:
+        List[Tuple[PathSpec, List[str]]]: Each usable spec with the prefixes
+        of its negations
+    """
+    result: List[Tuple[PathSpec, List[str]]] = []
+    for spec in specs:
+        if spec is None:
+            continue
+        prefixes = [negation_prefix(p) for p in spec.patterns if p.include is False]
+        if None not in prefixes:
+            result.append((spec, [prefix for prefix in prefixes if prefix is not None]))
+    return result
+
+def should_prune_dir(
+        dir_path: str,
+        relative_path: str,
+        specs: List[Tuple[PathSpec, List[str]]]
+    ) -> bool:
+    """Check if a directory and everything below it can be skipped.
+
+    Args:
+        dir_path: Full path to the directory
+        relative_path: Path relative to the repository root
+        specs: Specs returned by ``prunable_specs``
+
+    Returns:
+        bool: True if the directory should not be descended into
+    """
+    if is_ignored_path(dir_path):
+        return True
+    relative_path = relative_path.replace(os.sep, '/') + '/'
+    return any(
+        spec.match_file(relative_path) and not any(
+            relative_path.startswith(prefix) or prefix.startswith(relative_path)
+            for prefix in negation_prefixes
+        )
+        for spec, negation_prefixes in specs
+    )
+
+def walk_files(
+        path: str,
+        relative_dir: str = '',
+        skip_dir: Optional[Callable[[str, str], bool]] = None
+    ) -> Iterator[Tuple[str, str]]:
+    """Walk the directory top-down and yield files with their relative paths.
+
+    Mirrors the order of ``os.walk`` (files of a directory first, then its
+    subdirectories) but reuses ``DirEntry.path`` and builds relative paths by
+    concatenation instead of calling ``os.path.join``/``os.path.relpath`` per file.
+
+    Args:
+        path: Directory to walk
+        relative_dir: Path of ``path`` relative to the walk root
+        skip_dir: Called with the full and relative path of each subdirectory;
+            subdirectories for which it returns True are not descended into
+
+    Yields:
+        Tuple[str, str]: Full path and path relative to the walk root
+    """
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError as e:
+        logging.debug('Could not scan directory %s: %s', path, e)
+        return
+
+    prefix = relative_dir + os.sep if relative_dir else ''
+    sub_dirs: List[os.DirEntry] = []
+    for entry in entries:
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+        if not is_dir:
+            yield entry.path, prefix + entry.name
+        elif not entry.is_symlink():
+            sub_dirs.append(entry)
+
+    for entry in sub_dirs:
+        sub_relative_dir = prefix + entry.name
+        if skip_dir is not None and skip_dir(entry.path, sub_relative_dir):
+            logging.debug('Skipping ignored directory: %s', sub_relative_dir)
+            continue
+        yield from walk_files(entry.path, sub_relative_dir, skip_dir)
+
 def generate_output_content(
         path: str,
         tree_structure: str,
@@ -256,37 +437,39 @@ def generate_output_content(
     output_content.append('Directory Structure:\n')
     output_content.append('```\n.\n')
 
-    if os.path.exists(os.path.join(path, '.gitignore')):
+    if os.path.exists(os.path.join(path, _GITIGNORE)):
         output_content.append('├── .gitignore\n')
 
-    output_content.append(tree_structure + '\n' + '```\n')
+    output_content.append(tree_structure)
+    output_content.append('\n```\n')
     logging.debug('Tree structure written to output content')
 
-    for root, _, files in os.walk(path):
-        for filename in files:
-            file_path = os.path.join(root, filename)
-            relative_path = os.path.relpath(file_path, path)
-
-            if should_ignore_file(
-                file_path,
-                relative_path,
-                gitignore_spec,
-                content_ignore_spec,
-                tree_and_content_ignore_spec
-            ):
-                continue
-
-            relative_path = relative_path.replace('./', '', 1)
-
-            output_content.append(f'\nContents of {relative_path}:\n')
-            output_content.append('```\n')
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    output_content.append(f.read())
-            except UnicodeDecodeError:
-                logging.debug('Could not decode file contents: %s', file_path)
-                output_content.append('[Could not decode file contents]\n')
-            output_content.append('\n```\n')
+    specs = prunable_specs(gitignore_spec, content_ignore_spec, tree_and_content_ignore_spec)
+
+    def skip_dir(dir_path: str, relative_path: str) -> bool:
+        return should_prune_dir(dir_path, relative_path, specs)
+
+    for file_path, relative_path in walk_files(path, skip_dir=skip_dir):
+        if should_ignore_file(
+            file_path,
+            relative_path,
+            gitignore_spec,
+            content_ignore_spec,
+            tree_and_content_ignore_spec
+        ):
+            continue
+
+        relative_path = relative_path.replace('./', '', 1)
+
+        output_content.append(f'\nContents of {relative_path}:\n')
+        output_content.append('```\n')
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                output_content.append(f.read())
+        except UnicodeDecodeError:
+            logging.debug('Could not decode file contents: %s', file_path)
+            output_content.append('[Could not decode file contents]\n')
+        output_content.append('\n```\n')
 
     output_content.append('\n')
     logging.debug('Repository contents written to output content')
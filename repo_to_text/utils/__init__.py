@@ -1,5 +1,5 @@
 """This module contains utility functions for the repo_to_text package."""
 
-from .utils import setup_logging, check_tree_command, is_ignored_path
+from .utils import setup_logging, is_ignored_path
 
-__all__ = ['setup_logging', 'check_tree_command', 'is_ignored_path']
+__all__ = ['setup_logging', 'is_ignored_path']
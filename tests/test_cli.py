@@ -1,11 +1,10 @@
 """Test the CLI module."""
 
 import os
-import tempfile
-import shutil
-from typing import Generator
-from unittest.mock import patch, MagicMock
+from pathlib import Path
+from unittest.mock import patch, Mock
 import pytest
+from repo_to_text.cli import cli as cli_module
 from repo_to_text.cli.cli import (
     create_default_settings_file,
     parse_args,
@@ -14,13 +13,6 @@ from repo_to_text.cli.cli import (
 
 # pylint: disable=redefined-outer-name
 
-@pytest.fixture
-def temp_dir() -> Generator[str, None, None]:
-    """Create a temporary directory for testing."""
-    temp_path = tempfile.mkdtemp()
-    yield temp_path
-    shutil.rmtree(temp_path)
-
 def test_parse_args_defaults() -> None:
     """Test parsing command line arguments with default values."""
     with patch('sys.argv', ['repo-to-text']):
@@ -48,12 +40,11 @@ def test_parse_args_with_values() -> None:
         assert args.output_dir == 'output/path'
         assert args.ignore_patterns == ['*.log', 'temp/']
 
-def test_create_default_settings_file(temp_dir: str) -> None:
+def test_create_default_settings_file(tmp_path: Path) -> None:
     """Test creation of default settings file."""
-    os.chdir(temp_dir)
-    create_default_settings_file()
+    create_default_settings_file(str(tmp_path))
 
-    settings_file = '.repo-to-text-settings.yaml'
+    settings_file = os.path.join(str(tmp_path), '.repo-to-text-settings.yaml')
     assert os.path.exists(settings_file)
 
     with open(settings_file, 'r', encoding='utf-8') as f:
@@ -62,53 +53,67 @@ def test_create_default_settings_file(temp_dir: str) -> None:
         assert 'ignore-tree-and-content:' in content
         assert 'ignore-content:' in content
 
-def test_create_default_settings_file_already_exists(temp_dir: str) -> None:
+def test_create_default_settings_file_already_exists(tmp_path: Path) -> None:
     """Test handling of existing settings file."""
-    os.chdir(temp_dir)
     # Create the file first
-    create_default_settings_file()
+    create_default_settings_file(str(tmp_path))
 
     # Try to create it again
     with pytest.raises(FileExistsError) as exc_info:
-        create_default_settings_file()
+        create_default_settings_file(str(tmp_path))
     assert "already exists" in str(exc_info.value)
 
-@patch('repo_to_text.cli.cli.save_repo_to_text')
-def test_main_normal_execution(mock_save_repo: MagicMock) -> None:
+def test_main_normal_execution(monkeypatch: pytest.MonkeyPatch) -> None:
     """Test main function with normal execution."""
-    with patch('sys.argv', ['repo-to-text', '--stdout']):
-        with pytest.raises(SystemExit) as exc_info:
-            main()
-        assert exc_info.value.code == 0
-        mock_save_repo.assert_called_once_with(
-            path='.',
-            output_dir=None,
-            to_stdout=True,
-            cli_ignore_patterns=None
-        )
-
-@patch('repo_to_text.cli.cli.create_default_settings_file')
-def test_main_create_settings(mock_create_settings: MagicMock) -> None:
+    mock_save_repo = Mock()
+    monkeypatch.setattr(cli_module, 'save_repo_to_text', mock_save_repo)
+    monkeypatch.setattr('sys.argv', ['repo-to-text', '--stdout'])
+
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+    assert exc_info.value.code == 0
+    mock_save_repo.assert_called_once_with(
+        path='.',
+        output_dir=None,
+        to_stdout=True,
+        cli_ignore_patterns=None
+    )
+
+def test_main_create_settings(monkeypatch: pytest.MonkeyPatch) -> None:
     """Test main function with create settings option."""
-    with patch('sys.argv', ['repo-to-text', '--create-settings']):
-        with pytest.raises(SystemExit) as exc_info:
-            main()
-        assert exc_info.value.code == 0
-        mock_create_settings.assert_called_once()
-
-@patch('repo_to_text.cli.cli.setup_logging')
-@patch('repo_to_text.cli.cli.create_default_settings_file')
-def test_main_with_debug_logging(
-    mock_create_settings: MagicMock,
-    mock_setup_logging: MagicMock
-) -> None:
+    mock_create_settings = Mock()
+    monkeypatch.setattr(cli_module, 'create_default_settings_file', mock_create_settings)
+    monkeypatch.setattr('sys.argv', ['repo-to-text', '--create-settings'])
+
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+    assert exc_info.value.code == 0
+    mock_create_settings.assert_called_once_with('.')
+
+def test_main_init_with_input_dir(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test that --init creates the settings file in the given input directory."""
+    mock_create_settings = Mock()
+    monkeypatch.setattr(cli_module, 'create_default_settings_file', mock_create_settings)
+    monkeypatch.setattr('sys.argv', ['repo-to-text', 'some/dir', '--init'])
+
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+    assert exc_info.value.code == 0
+    mock_create_settings.assert_called_once_with('some/dir')
+
+def test_main_with_debug_logging(monkeypatch: pytest.MonkeyPatch) -> None:
     """Test main function with debug logging enabled."""
-    with patch('sys.argv', ['repo-to-text', '--debug', '--create-settings']):
-        with pytest.raises(SystemExit) as exc_info:
-            main()
-        assert exc_info.value.code == 0
-        mock_setup_logging.assert_called_once_with(debug=True)
-        mock_create_settings.assert_called_once()
+    mock_setup_logging = Mock()
+    mock_create_settings = Mock()
+    monkeypatch.setattr(cli_module, 'setup_logging', mock_setup_logging)
+    monkeypatch.setattr(cli_module, 'create_default_settings_file', mock_create_settings)
+    monkeypatch.setattr('sys.argv', ['repo-to-text', '--debug', '--create-settings'])
+
+    with pytest.raises(SystemExit) as exc_info:
+        main()
+    assert exc_info.value.code == 0
+    mock_setup_logging.assert_called_once_with(debug=True)
+    mock_create_settings.assert_called_once()
 
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -1,14 +1,19 @@
 """Test the core module."""
 
 import os
-import tempfile
+import re
 import shutil
-from typing import Generator
+from pathlib import Path
+from typing import Dict, Generator, List, Optional, Tuple
 import pytest
+from pathspec import PathSpec
 
 from repo_to_text.core.core import (
+    CombinedPathSpec,
     get_tree_structure,
     load_ignore_specs,
+    prunable_specs,
+    should_prune_dir,
     should_ignore_file,
     is_ignored_path,
     save_repo_to_text
@@ -16,20 +21,29 @@ from repo_to_text.core.core import (
 
 # pylint: disable=redefined-outer-name
 
-@pytest.fixture
-def temp_dir() -> Generator[str, None, None]:
-    """Create a temporary directory for testing."""
-    temp_path = tempfile.mkdtemp()
-    yield temp_path
-    shutil.rmtree(temp_path)
+BINARY_CONTENT = b'\x00\x01\x02\x03'
+BINARY_EXPECTED = (
+    "Contents of binary.bin:\n```\n" + BINARY_CONTENT.decode('latin1') + "\n```"
+)
 
-@pytest.fixture
-def sample_repo(tmp_path: str) -> str:
-    """Create a sample repository structure for testing."""
-    tmp_path_str = str(tmp_path)
-    # Create directories
-    os.makedirs(os.path.join(tmp_path_str, "src"))
-    os.makedirs(os.path.join(tmp_path_str, "tests"))
+def snapshot_tree(root: str) -> Dict[str, bytes]:
+    """Map every file under root to its contents."""
+    snapshot: Dict[str, bytes] = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            full_path = os.path.join(dirpath, filename)
+            with open(full_path, "rb") as f:
+                snapshot[os.path.relpath(full_path, root)] = f.read()
+    return snapshot
+
+@pytest.fixture(scope="session")
+def sample_repo(tmp_path_factory: pytest.TempPathFactory) -> Generator[str, None, None]:
+    """Create a sample repository structure for testing.
+
+    The repository is shared by the whole session and must be treated as
+    read-only; tests that need to modify it should work on a copy.
+    """
+    tmp_path_str = str(tmp_path_factory.mktemp("sample_repo"))
 
     # Create sample files
     files = {
@@ -51,13 +65,36 @@ ignore-content:
 """
     }
 
+    # Create each subdirectory once (the root already exists), then write the files
+    root = Path(tmp_path_str)
+    for parent in {(root / file_path).parent for file_path in files} - {root}:
+        parent.mkdir(parents=True, exist_ok=True)
     for file_path, content in files.items():
-        full_path = os.path.join(tmp_path_str, file_path)
-        os.makedirs(os.path.dirname(full_path), exist_ok=True)
-        with open(full_path, "w", encoding='utf-8') as f:
-            f.write(content)
+        (root / file_path).write_bytes(content.encode('utf-8'))
+
+    initial_snapshot = snapshot_tree(tmp_path_str)
+    yield tmp_path_str
+    assert snapshot_tree(tmp_path_str) == initial_snapshot, \
+        "sample_repo was modified by a test"
 
-    return tmp_path_str
+@pytest.fixture
+def sample_repo_working(sample_repo: str, tmp_path: Path) -> str:
+    """Provide a per-test copy of sample_repo that tests may modify.
+
+    Files are hard-linked rather than copied, so only directory entries are
+    created. Tests may add or replace files but must not write into the
+    linked files in place.
+    """
+    repo_path = str(tmp_path / "repo")
+    shutil.copytree(sample_repo, repo_path, copy_function=os.link)
+    return repo_path
+
+@pytest.fixture(scope="session")
+def sample_repo_specs(
+    sample_repo: str
+) -> Tuple[Optional[PathSpec], Optional[PathSpec], PathSpec]:
+    """Load the ignore specifications of sample_repo once per session."""
+    return load_ignore_specs(sample_repo)
 
 def test_is_ignored_path() -> None:
     """Test the is_ignored_path function."""
@@ -87,11 +124,30 @@ def test_load_ignore_specs(sample_repo: str) -> None:
     # Test tree and content ignore patterns
     assert tree_and_content_ignore_spec.match_file(".git/config") is True
 
-def test_should_ignore_file(sample_repo: str) -> None:
+@pytest.mark.parametrize("patterns", [
+    ["*.pyc", "__pycache__/", ".git/", "src/**/x", "/root.txt"],
+    ["*.txt", "!README.txt"],
+    ["*.txt", "!docs/*.txt", "docs/README.txt", "src/", "!src/main.py"],
+    [],
+])
+def test_combined_path_spec_matches_pathspec(patterns: List[str]) -> None:
+    """Test that CombinedPathSpec matches exactly like a regular PathSpec."""
+    expected_spec = PathSpec.from_lines('gitwildmatch', patterns)
+    combined_spec = CombinedPathSpec.from_lines('gitwildmatch', patterns)
+
+    paths = [
+        "test.pyc", "a/b/test.pyc", "__pycache__/cache.py", ".git/config",
+        "src/x", "src/a/b/x", "root.txt", "sub/root.txt", "notes.txt",
+        "README.txt", "docs/README.txt", "src/main.py",
+    ]
+    for path in paths:
+        assert combined_spec.match_file(path) is expected_spec.match_file(path), path
+
+def test_should_ignore_file(
+    sample_repo_specs: Tuple[Optional[PathSpec], Optional[PathSpec], PathSpec]
+) -> None:
     """Test file ignoring logic."""
-    gitignore_spec, content_ignore_spec, tree_and_content_ignore_spec = load_ignore_specs(
-        sample_repo
-    )
+    gitignore_spec, content_ignore_spec, tree_and_content_ignore_spec = sample_repo_specs
 
     # Test various file paths
     assert should_ignore_file(
@@ -110,9 +166,12 @@ def test_should_ignore_file(sample_repo: str) -> None:
         tree_and_content_ignore_spec
     ) is False
 
-def test_get_tree_structure(sample_repo: str) -> None:
+def test_get_tree_structure(
+    sample_repo: str,
+    sample_repo_specs: Tuple[Optional[PathSpec], Optional[PathSpec], PathSpec]
+) -> None:
     """Test tree structure generation."""
-    gitignore_spec, _, tree_and_content_ignore_spec = load_ignore_specs(sample_repo)
+    gitignore_spec, _, tree_and_content_ignore_spec = sample_repo_specs
     tree_output = get_tree_structure(sample_repo, gitignore_spec, tree_and_content_ignore_spec)
 
     # Basic structure checks
@@ -122,45 +181,56 @@ def test_get_tree_structure(sample_repo: str) -> None:
     assert "test_main.py" in tree_output
     assert ".git" not in tree_output
 
-def test_save_repo_to_text(sample_repo: str) -> None:
+def test_save_repo_to_text(sample_repo_working: str, tmp_path: Path) -> None:
     """Test the main save_repo_to_text function."""
+    repo_path = sample_repo_working
+
     # Create output directory
-    output_dir = os.path.join(sample_repo, "output")
-    os.makedirs(output_dir, exist_ok=True)
+    output_dir = tmp_path / "output"
+    output_dir.mkdir()
 
     # Create .git directory to ensure it's properly ignored
-    os.makedirs(os.path.join(sample_repo, ".git"))
-    with open(os.path.join(sample_repo, ".git/config"), "w", encoding='utf-8') as f:
+    os.makedirs(os.path.join(repo_path, ".git"))
+    with open(os.path.join(repo_path, ".git/config"), "w", encoding='utf-8') as f:
         f.write("[core]\n\trepositoryformatversion = 0\n")
 
     # Test file output
-    output_file = save_repo_to_text(sample_repo, output_dir=output_dir)
+    output_file = save_repo_to_text(repo_path, output_dir=output_dir)
     assert os.path.exists(output_file)
-    assert os.path.dirname(output_file) == output_dir
+    assert os.path.dirname(output_file) == str(output_dir)
 
-    # Check file contents
-    with open(output_file, 'r', encoding='utf-8') as f:
+    # Check file contents as raw bytes, all patterns are ASCII
+    with open(output_file, 'rb') as f:
         content = f.read()
 
+    expected_patterns = {
         # Basic content checks
-        assert "Directory Structure:" in content
-
+        b"Directory Structure:",
         # Check for expected files
-        assert "src/main.py" in content
-        assert "tests/test_main.py" in content
-
+        b"src/main.py",
+        b"tests/test_main.py",
         # Check for file contents
-        assert "print('Hello World')" in content
-        assert "def test_sample(): pass" in content
-
+        b"print('Hello World')",
+        b"def test_sample(): pass",
+    }
+    ignored_patterns = [
         # Ensure ignored patterns are not in output
-        assert ".git/config" not in content  # Check specific file
-        assert "repo-to-text_" not in content
-        assert ".repo-to-text-settings.yaml" not in content
-
+        b".git/config",
+        b"repo-to-text_",
+        b".repo-to-text-settings.yaml",
         # Check that .gitignore content is not included
-        assert "*.pyc" not in content
-        assert "__pycache__" not in content
+        b"*.pyc",
+        b"__pycache__",
+    ]
+
+    # Match all patterns of each kind in a single scan over the output
+    expected_re = re.compile(b"|".join(map(re.escape, expected_patterns)))
+    ignored_re = re.compile(b"|".join(map(re.escape, ignored_patterns)))
+
+    found = {match.group() for match in expected_re.finditer(content)}
+    assert found == expected_patterns, f"Missing from output: {expected_patterns - found}"
+    ignored_match = ignored_re.search(content)
+    assert ignored_match is None, f"Ignored pattern in output: {ignored_match.group()!r}"
 
 def test_save_repo_to_text_stdout(sample_repo: str) -> None:
     """Test save_repo_to_text with stdout output."""
@@ -179,32 +249,32 @@ def test_load_ignore_specs_with_cli_patterns(sample_repo: str) -> None:
     assert tree_and_content_ignore_spec.match_file("temp/file.txt") is True
     assert tree_and_content_ignore_spec.match_file("normal.txt") is False
 
-def test_load_ignore_specs_without_gitignore(temp_dir: str) -> None:
+def test_load_ignore_specs_without_gitignore(tmp_path: Path) -> None:
     """Test loading ignore specs when .gitignore is missing."""
     gitignore_spec, content_ignore_spec, tree_and_content_ignore_spec = load_ignore_specs(
-        temp_dir
+        str(tmp_path)
     )
     assert gitignore_spec is None
     assert content_ignore_spec is None
     assert tree_and_content_ignore_spec is not None
 
-def test_get_tree_structure_with_special_chars(temp_dir: str) -> None:
+def test_get_tree_structure_with_special_chars(tmp_path: Path) -> None:
     """Test tree structure generation with special characters in paths."""
     # Create files with special characters
-    special_dir = os.path.join(temp_dir, "special chars")
-    os.makedirs(special_dir)
-    with open(os.path.join(special_dir, "file with spaces.txt"), "w", encoding='utf-8') as f:
-        f.write("test")
+    special_dir = tmp_path / "special chars"
+    special_dir.mkdir()
+    (special_dir / "file with spaces.txt").write_text("test", encoding='utf-8')
 
-    tree_output = get_tree_structure(temp_dir)
+    tree_output = get_tree_structure(str(tmp_path))
     assert "special chars" in tree_output
     assert "file with spaces.txt" in tree_output
 
-def test_should_ignore_file_edge_cases(sample_repo: str) -> None:
+def test_should_ignore_file_edge_cases(
+    sample_repo: str,
+    sample_repo_specs: Tuple[Optional[PathSpec], Optional[PathSpec], PathSpec]
+) -> None:
     """Test edge cases for should_ignore_file function."""
-    gitignore_spec, content_ignore_spec, tree_and_content_ignore_spec = load_ignore_specs(
-        sample_repo
-    )
+    gitignore_spec, content_ignore_spec, tree_and_content_ignore_spec = sample_repo_specs
 
     # Test with dot-prefixed paths
     assert should_ignore_file(
@@ -226,43 +296,38 @@ def test_should_ignore_file_edge_cases(sample_repo: str) -> None:
         tree_and_content_ignore_spec
     ) is False
 
-def test_save_repo_to_text_with_binary_files(temp_dir: str) -> None:
+def test_save_repo_to_text_with_binary_files(tmp_path: Path) -> None:
     """Test handling of binary files in save_repo_to_text."""
     # Create a binary file
-    binary_path = os.path.join(temp_dir, "binary.bin")
-    binary_content = b'\x00\x01\x02\x03'
-    with open(binary_path, "wb") as f:
-        f.write(binary_content)
+    (tmp_path / "binary.bin").write_bytes(BINARY_CONTENT)
 
-    output = save_repo_to_text(temp_dir, to_stdout=True)
+    output = save_repo_to_text(tmp_path, to_stdout=True)
 
     # Check that the binary file is listed in the structure
     assert "binary.bin" in output
     # Check that the file content section exists with raw binary content
-    expected_content = f"Contents of binary.bin:\n```\n{binary_content.decode('latin1')}\n```"
-    assert expected_content in output
+    assert BINARY_EXPECTED in output
 
-def test_save_repo_to_text_custom_output_dir(temp_dir: str) -> None:
+def test_save_repo_to_text_custom_output_dir(tmp_path: Path) -> None:
     """Test save_repo_to_text with custom output directory."""
     # Create a simple file structure
-    with open(os.path.join(temp_dir, "test.txt"), "w", encoding='utf-8') as f:
-        f.write("test content")
+    (tmp_path / "test.txt").write_text("test content", encoding='utf-8')
 
     # Create custom output directory
-    output_dir = os.path.join(temp_dir, "custom_output")
-    output_file = save_repo_to_text(temp_dir, output_dir=output_dir)
+    output_dir = tmp_path / "custom_output"
+    output_file = save_repo_to_text(tmp_path, output_dir=output_dir)
 
     assert os.path.exists(output_file)
-    assert os.path.dirname(output_file) == output_dir
-    assert output_file.startswith(output_dir)
+    assert os.path.dirname(output_file) == str(output_dir)
+    assert output_file.startswith(str(output_dir))
 
-def test_get_tree_structure_empty_directory(temp_dir: str) -> None:
+def test_get_tree_structure_empty_directory(tmp_path: Path) -> None:
     """Test tree structure generation for empty directory."""
-    tree_output = get_tree_structure(temp_dir)
+    tree_output = get_tree_structure(str(tmp_path))
     # Should only contain the directory itself
-    assert tree_output.strip() == "" or tree_output.strip() == temp_dir
+    assert tree_output.strip() == "" or tree_output.strip() == str(tmp_path)
 
-def test_empty_dirs_filtering(tmp_path: str) -> None:
+def test_empty_dirs_filtering(tmp_path: Path) -> None:
     """Test filtering of empty directories in tree structure generation."""
     # Create test directory structure with normalized paths
     base_path = os.path.normpath(tmp_path)
@@ -283,23 +348,107 @@ def test_empty_dirs_filtering(tmp_path: str) -> None:
     # Get tree structure directly using the function
     tree_output = get_tree_structure(base_path)
 
-    # Print debug information
-    print("\nTree output:")
-    print(tree_output)
-
     # Basic structure checks for directories with files
-    assert "src" in tree_output
-    assert "tests" in tree_output
-    assert "main.py" in tree_output
-    assert "test_main.py" in tree_output
-
-    # Check that empty directory is not included by checking each line
-    for line in tree_output.splitlines():
-        # Skip the root directory line
-        if base_path in line:
-            continue
-        # Check that no line contains 'empty_dir'
-        assert "empty_dir" not in line, f"Found empty_dir in line: {line}"
+    for expected in ("src", "tests", "main.py", "test_main.py"):
+        if expected not in tree_output:
+            pytest.fail(f"{expected!r} missing from tree output:\n{tree_output}")
+
+    # Check that empty directory is not included, skipping the root directory line
+    offending = [
+        line for line in tree_output.splitlines()
+        if base_path not in line and "empty_dir" in line
+    ]
+    assert not offending, f"Found empty_dir in lines: {offending}"
+
+def test_get_tree_structure_exact_output(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test the exact tree lines, including filtering, indents and symlinks."""
+    (tmp_path / "a_dir" / "nested").mkdir(parents=True)
+    (tmp_path / "a_dir" / "empty").mkdir()
+    (tmp_path / "a_dir" / "file1.txt").write_text("one", encoding='utf-8')
+    (tmp_path / "a_dir" / "nested" / "deep.txt").write_text("deep", encoding='utf-8')
+    (tmp_path / "a_dir" / "zz.log").write_text("log", encoding='utf-8')
+    (tmp_path / "ignored_dir").mkdir()
+    (tmp_path / "ignored_dir" / "x.txt").write_text("x", encoding='utf-8')
+    (tmp_path / "link.txt").symlink_to(os.path.join("a_dir", "file1.txt"))
+    (tmp_path / "B_file.txt").write_text("b", encoding='utf-8')
+    (tmp_path / "z_file.txt").write_text("z", encoding='utf-8')
+    (tmp_path / "zz_empty").mkdir()
+    gitignore_spec = PathSpec.from_lines('gitwildmatch', ["ignored_dir/", "*.log"])
+
+    pipe = "\u2502\u00a0\u00a0 "  # `tree` indents with non-breaking spaces
+
+    def expected_tree(prefix: str) -> str:
+        return "\n".join([
+            f"├── {prefix}a_dir",
+            f"{pipe}├── {prefix}a_dir/file1.txt",
+            f"{pipe}└── {prefix}a_dir/nested",
+            f"{pipe}    └── {prefix}a_dir/nested/deep.txt",
+            f"├── {prefix}B_file.txt",
+            f"├── {prefix}link.txt -> a_dir/file1.txt",
+            f"└── {prefix}z_file.txt",
+        ])
+
+    root = str(tmp_path)
+    assert get_tree_structure(root, gitignore_spec) == expected_tree(root + "/")
+    assert get_tree_structure(root + "/", gitignore_spec) == expected_tree(root + "/")
+
+    monkeypatch.chdir(tmp_path)
+    assert get_tree_structure(".", gitignore_spec) == expected_tree("")
+
+def test_save_repo_to_text_ignored_dirs_and_negations(tmp_path: Path) -> None:
+    """Test that skipping ignored directories keeps files re-included with '!'."""
+    files = {
+        ".gitignore": "node_modules/\n/build/\n!/build/keep.txt\n",
+        ".repo-to-text-settings.yaml": """
+gitignore-import-and-ignore: True
+ignore-content:
+  - "*.log"
+  - "!keep.log"
+  - "logs/"
+  - "!logs/keep.log"
+""",
+        "main.py": "print('main')",
+        "node_modules/pkg/index.js": "module.exports = {};",
+        "build/keep.txt": "kept build file",
+        "build/out.o": "object file",
+        "sub/keep.log": "kept sub log",
+        "sub/debug.log": "debug log",
+        "logs/keep.log": "kept logs log",
+        "logs/other.txt": "other",
+    }
+    for file_path, content in files.items():
+        (tmp_path / file_path).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / file_path).write_text(content, encoding='utf-8')
+
+    output = save_repo_to_text(str(tmp_path), to_stdout=True)
+
+    assert "Contents of main.py:" in output
+    assert "node_modules" not in output
+    assert "module.exports" not in output
+    assert "Contents of sub/keep.log:" in output
+    assert "Contents of logs/keep.log:" in output
+    assert "Contents of sub/debug.log:" not in output
+    assert "Contents of logs/other.txt:" not in output
+    assert "Contents of build/keep.txt:" in output
+    assert "build/out.o" not in output
+
+def test_should_prune_dir_with_negations() -> None:
+    """Test that only negations that can match below a directory stop pruning."""
+    specs = prunable_specs(CombinedPathSpec.from_lines(
+        'gitwildmatch', ["node_modules/", "/build/", "!/build/keep.txt"]
+    ))
+    assert should_prune_dir("node_modules", "node_modules", specs) is True
+    assert should_prune_dir("src/node_modules", "src/node_modules", specs) is True
+    assert should_prune_dir("build", "build", specs) is False
+    assert should_prune_dir("src", "src", specs) is False
+
+    # A negation that can match at any depth may re-include files anywhere
+    assert not prunable_specs(PathSpec.from_lines(
+        'gitwildmatch', ["node_modules/", "!.env.example"]
+    ))
 
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -9,21 +9,26 @@ from repo_to_text.utils.utils import setup_logging
 
 @pytest.fixture(autouse=True)
 def reset_logger() -> Generator[None, None, None]:
-    """Reset root logger before each test."""
+    """Reset root logger before each test and restore it afterwards.
+
+    Tests that call ``basicConfig`` still clear the handlers themselves:
+    pytest attaches its log capture handlers only after fixtures are set up.
+    """
     root_logger = logging.getLogger()
-    for handler in root_logger.handlers[:]:
-        root_logger.removeHandler(handler)
+    saved_handlers = root_logger.handlers[:]
+    saved_level = root_logger.level
+    root_logger.handlers[:] = []
     root_logger.setLevel(logging.WARNING)  # Default level
-    yield
-    for handler in root_logger.handlers[:]:
-        root_logger.removeHandler(handler)
-    root_logger.setLevel(logging.WARNING)  # Reset after test
+    try:
+        yield
+    finally:
+        root_logger.handlers[:] = saved_handlers
+        root_logger.setLevel(saved_level)
 
 def test_setup_logging_debug() -> None:
     """Test setup_logging with debug mode."""
     root_logger = logging.getLogger()
     root_logger.handlers.clear()  # Clear existing handlers
-    root_logger.setLevel(logging.WARNING)  # Reset to default
 
     setup_logging(debug=True)
     assert len(root_logger.handlers) > 0
@@ -33,7 +38,6 @@ def test_setup_logging_info() -> None:
     """Test setup_logging with info mode."""
     root_logger = logging.getLogger()
     root_logger.handlers.clear()  # Clear existing handlers
-    root_logger.setLevel(logging.WARNING)  # Reset to default
 
     setup_logging(debug=False)
     assert len(root_logger.handlers) > 0